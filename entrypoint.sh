@@ -0,0 +1,20 @@
+#!/bin/sh
+# Container entrypoint: one-time setup in this process, then hand off to the uvicorn workers.
+set -e
+
+# One signing key shared by every worker in this container. Set JWT_SECRET explicitly
+# when running several replicas so tokens verify on all of them.
+if [ -z "${JWT_SECRET}" ]; then
+    JWT_SECRET="$(/app/.venv/bin/python -c 'import secrets; print(secrets.token_urlsafe(32))')"
+fi
+export JWT_SECRET
+
+# Create/migrate the schema once, before the workers start.
+/app/.venv/bin/python -c 'import main; main.init_db()'
+
+# One worker per CPU unless WEB_CONCURRENCY says otherwise.
+# Workers share jokes.db through SQLite WAL, which needs a local filesystem (not NFS).
+exec /app/.venv/bin/uvicorn main:app \
+    --host 0.0.0.0 --port 8000 \
+    --workers "${WEB_CONCURRENCY:-$(nproc)}" \
+    --loop uvloop --http httptools --backlog 4096
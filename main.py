@@ -10,63 +10,341 @@ What it does:
 Intentionally *omitted* (on purpose for the interviewee to add/justify):
 - Health/readiness/liveness endpoints
 - Observability/metrics
-- Robust retries/circuit breakers
 - Proper user management & secure auth
 - Migrations and production DB settings
 """
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import os
+import random
 import secrets
 import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 
+import anyio.to_thread
 import httpx
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
 DB_PATH = os.getenv("DATABASE_PATH", "jokes.db")
 EXTERNAL_JOKE_BASE_URL = os.getenv("EXTERNAL_JOKE_BASE_URL", "https://official-joke-api.appspot.com")
 REQUEST_TIMEOUT_S = float(os.getenv("REQUEST_TIMEOUT_S", "3.0"))
+FETCH_ATTEMPTS = int(os.getenv("FETCH_ATTEMPTS", "3"))
+BREAKER_FAIL_MAX = int(os.getenv("BREAKER_FAIL_MAX", "5"))
+BREAKER_RESET_S = float(os.getenv("BREAKER_RESET_S", "30"))
+# Sync endpoints and dependencies run in anyio's threadpool (default 40 threads).
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "200"))
 
-# --- super-minimal "auth" (in-memory) ----------------------------------------
+# --- super-minimal "auth" (stateless HS256 JWT) ------------------------------
 # One demo user; replace with real auth in production.
 DEMO_USERS = {"admin": "admin"}  # username: password
-TOKENS: Dict[str, str] = {}  # token -> username
+# All workers/replicas must share JWT_SECRET (the container entrypoint generates one per container).
+# The random fallback is only good for a single process: its tokens don't verify anywhere else.
+JWT_SECRET = os.getenv("JWT_SECRET") or secrets.token_urlsafe(32)
+if not os.getenv("JWT_SECRET") and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    raise RuntimeError("JWT_SECRET must be set when running more than one worker")
+JWT_TTL_S = int(os.getenv("JWT_TTL_S", "3600"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+_JWT_KEY = JWT_SECRET.encode()
+_JWT_HEADER = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+def _jwt_sign(signing_input: str) -> bytes:
+    return hmac.new(_JWT_KEY, signing_input.encode(), hashlib.sha256).digest()
+
+def issue_jwt(sub: str) -> str:
+    claims = {"sub": sub, "exp": int(time.time()) + JWT_TTL_S}
+    signing_input = f"{_JWT_HEADER}.{_b64url(json.dumps(claims, separators=(',', ':')).encode())}"
+    return f"{signing_input}.{_b64url(_jwt_sign(signing_input))}"
+
+def decode_jwt(token: str) -> Dict[str, Any]:
+    """Verify a token from issue_jwt() and return its claims; raise ValueError if invalid or expired."""
+    header, sep, rest = token.partition(".")
+    payload, sep2, sig = rest.partition(".")
+    if not (sep and sep2) or header != _JWT_HEADER:  # only our own header, so no alg confusion
+        raise ValueError("malformed token")
+    if not hmac.compare_digest(_b64url_decode(sig), _jwt_sign(f"{header}.{payload}")):
+        raise ValueError("bad signature")
+    claims = json.loads(_b64url_decode(payload))
+    if claims.get("exp", 0) <= time.time():
+        raise ValueError("token expired")
+    return claims
+
+# Short-lived cache of validated tokens, keyed by a digest so raw tokens aren't duplicated.
+TOKEN_CACHE_TTL_S = 60.0
+TOKEN_CACHE_MAX = 10_000
+_token_cache: Dict[bytes, tuple[str, float]] = {}  # digest -> (username, expires_at epoch)
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
-    user = TOKENS.get(token)
-    if not user:
+    key = _token_key(token)
+    now = time.time()
+    hit = _token_cache.get(key)
+    if hit and hit[1] > now:
+        return hit[0]
+
+    try:
+        claims = decode_jwt(token)
+    except ValueError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user = claims["sub"]
+    if len(_token_cache) >= TOKEN_CACHE_MAX:
+        _token_cache.clear()  # crude bound; entries are cheap to repopulate
+    _token_cache[key] = (user, min(now + TOKEN_CACHE_TTL_S, claims["exp"]))
     return user
 
 # --- DB helpers ---------------------------------------------------------------
+class _Connection(sqlite3.Connection):
+    """Plain sqlite3.Connection, subclassed only so it can be weakly referenced (see _conns)."""
+
 def connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=_Connection)
+    # Per-connection settings; journal_mode=WAL is persisted on the file by init_db().
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-8000")  # ~8 MiB
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
     return conn
 
+_local = threading.local()
+# Weak, so a connection is closed and dropped once its thread exits (anyio retires idle
+# pool threads) instead of accumulating for the life of the process.
+_conns: weakref.WeakSet[sqlite3.Connection] = weakref.WeakSet()
+_conns_lock = threading.Lock()
+_conns_generation = 0  # bumped by close_conns() so threads drop their closed handles
+
+def get_conn() -> sqlite3.Connection:
+    """Return this thread's long-lived connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _conns_generation:
+        conn = _local.conn = connect()
+        _local.generation = _conns_generation
+        with _conns_lock:
+            _conns.add(conn)
+    return conn
+
+def close_conns() -> None:
+    global _conns_generation
+    with _conns_lock:
+        for conn in list(_conns):
+            conn.close()
+        _conns.clear()
+        _conns_generation += 1
+
+JOKES_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    external_id INTEGER UNIQUE,
+    type TEXT,
+    setup TEXT NOT NULL,
+    punchline TEXT NOT NULL,
+    created_at INTEGER NOT NULL  -- unix epoch milliseconds
+)
+"""
+
+# Run one at a time (not via executescript, which would COMMIT) so init_db can keep them in one transaction.
+SCHEMA_STATEMENTS = (
+    JOKES_TABLE_DDL.format(table="jokes"),
+    "CREATE INDEX IF NOT EXISTS ix_jokes_created_at ON jokes(created_at DESC)",
+    # Full-text index for `q` searches. The trigram tokenizer keeps the
+    # substring semantics of LIKE '%q%' without scanning the whole table.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS jokes_fts USING fts5(
+        setup, punchline, content='jokes', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_ai AFTER INSERT ON jokes BEGIN
+        INSERT INTO jokes_fts(rowid, setup, punchline) VALUES (new.id, new.setup, new.punchline);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_ad AFTER DELETE ON jokes BEGIN
+        INSERT INTO jokes_fts(jokes_fts, rowid, setup, punchline) VALUES ('delete', old.id, old.setup, old.punchline);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jokes_fts_au AFTER UPDATE ON jokes BEGIN
+        INSERT INTO jokes_fts(jokes_fts, rowid, setup, punchline) VALUES ('delete', old.id, old.setup, old.punchline);
+        INSERT INTO jokes_fts(rowid, setup, punchline) VALUES (new.id, new.setup, new.punchline);
+    END
+    """,
+)
+
+def _migrate_created_at_to_epoch(conn: sqlite3.Connection) -> None:
+    """Rewrite a pre-existing jokes table whose created_at is ISO-8601 TEXT into epoch-ms INTEGER.
+
+    Must run inside init_db()'s write transaction, so the type check can't race another worker.
+    """
+    cols = {name: decl for _, name, decl, *_ in conn.execute("PRAGMA table_info(jokes)")}
+    if cols.get("created_at", "").upper() != "TEXT":
+        return
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'jokes'").fetchone()
+    conn.execute(JOKES_TABLE_DDL.format(table="jokes_new"))
+    conn.execute(
+        """
+        INSERT INTO jokes_new (id, external_id, type, setup, punchline, created_at)
+        SELECT id, external_id, type, setup, punchline,
+               CAST(round((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER)
+        FROM jokes
+        """
+    )
+    conn.execute("DROP TABLE jokes")  # also drops its index and FTS triggers, recreated by init_db()
+    conn.execute("ALTER TABLE jokes_new RENAME TO jokes")
+    if seq:  # keep AUTOINCREMENT from reusing ids of deleted rows
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'jokes'", (seq[0],))
+
 def init_db() -> None:
-    with connect() as conn:
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS jokes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                external_id INTEGER UNIQUE,
-                type TEXT,
-                setup TEXT NOT NULL,
-                punchline TEXT NOT NULL,
-                created_at TEXT NOT NULL
-            );
-            CREATE INDEX IF NOT EXISTS ix_jokes_created_at ON jokes(created_at DESC);
-            """
-        )
-        conn.commit()
+    conn = connect()
+    conn.isolation_level = None  # manage the transaction explicitly below
+    try:
+        # WAL lets readers proceed while fetch_and_store holds the write lock.
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Every worker runs this at startup; the write lock serializes them, so checks
+        # below see the schema as the previous worker left it.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fts_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jokes_fts'"
+            ).fetchone()
+            _migrate_created_at_to_epoch(conn)
+            for stmt in SCHEMA_STATEMENTS:
+                conn.execute(stmt)
+            if not fts_exists:
+                # Index rows that predate the FTS table.
+                conn.execute("INSERT INTO jokes_fts(jokes_fts) VALUES ('rebuild')")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+# --- SQL ----------------------------------------------------------------------
+# Fixed statement text lets sqlite3's per-connection statement cache reuse the compiled bytecode.
+# Connections return plain tuples (no row_factory); zip them with JOKE_FIELDS when building responses.
+JOKE_FIELDS = ("id", "external_id", "type", "setup", "punchline", "created_at")
+JOKE_COLS = ", ".join(JOKE_FIELDS)
+
+SQL_INSERT = f"""
+INSERT OR IGNORE INTO jokes (external_id, type, setup, punchline, created_at)
+VALUES (?, ?, ?, ?, ?)
+RETURNING {JOKE_COLS}
+"""
+SQL_GET_ONE = f"SELECT {JOKE_COLS} FROM jokes WHERE id = ?"
+SQL_LATEST = f"SELECT {JOKE_COLS} FROM jokes ORDER BY id DESC LIMIT ?"
+
+SQL_LIST = f"SELECT {JOKE_COLS} FROM jokes WHERE id < ? ORDER BY id DESC LIMIT ? OFFSET ?"
+SQL_COUNT = "SELECT COUNT(*) FROM jokes"
+SQL_LIST_SEARCH = """
+SELECT j.id, j.external_id, j.type, j.setup, j.punchline, j.created_at
+FROM jokes_fts f JOIN jokes j ON j.id = f.rowid
+WHERE jokes_fts MATCH ? AND j.id < ?
+ORDER BY j.id DESC
+LIMIT ? OFFSET ?
+"""
+SQL_COUNT_SEARCH = "SELECT COUNT(*) FROM jokes_fts WHERE jokes_fts MATCH ?"
+SQL_LIST_LIKE = f"""
+SELECT {JOKE_COLS}
+FROM jokes
+WHERE id < ? AND (setup LIKE ? OR punchline LIKE ?)
+ORDER BY id DESC
+LIMIT ? OFFSET ?
+"""
+SQL_COUNT_LIKE = "SELECT COUNT(*) FROM jokes WHERE setup LIKE ? OR punchline LIKE ?"
+
+MAX_ROWID = 2**63 - 1  # keyset cursor used when no `before_id` is given
+FTS_MIN_QUERY_LEN = 3  # the trigram tokenizer can't match anything shorter
+
+def fts_phrase(q: str) -> str:
+    """Quote `q` as a single FTS5 phrase so user input is never parsed as query syntax."""
+    return '"' + q.replace('"', '""') + '"'
+
+# external_ids known to be stored already. The upstream pool is small, so repeats are
+# common; skipping them avoids taking the write lock and appending to the WAL for nothing.
+# INSERT OR IGNORE stays the source of truth (this cache is per process).
+SEEN_EXTERNAL_IDS_MAX = 4096
+_seen_external_ids: OrderedDict[int, None] = OrderedDict()
+_seen_lock = threading.Lock()
+
+def _drop_seen(jokes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop jokes whose external_id was recently stored or repeats earlier in the batch."""
+    fresh: List[Dict[str, Any]] = []
+    batch: set[int] = set()
+    with _seen_lock:
+        for d in jokes:
+            ext_id = d.get("id")
+            if ext_id in _seen_external_ids:
+                _seen_external_ids.move_to_end(ext_id)
+                continue
+            if ext_id is not None:
+                if ext_id in batch:
+                    continue
+                batch.add(ext_id)
+            fresh.append(d)
+    return fresh
+
+def _mark_seen(ext_ids: List[Optional[int]]) -> None:
+    with _seen_lock:
+        for ext_id in ext_ids:
+            if ext_id is not None:
+                _seen_external_ids[ext_id] = None
+                _seen_external_ids.move_to_end(ext_id)
+        while len(_seen_external_ids) > SEEN_EXTERNAL_IDS_MAX:
+            _seen_external_ids.popitem(last=False)
+
+def persist_jokes(jokes: List[Dict[str, Any]], count: int) -> List[tuple]:
+    """Store `jokes` and return the rows inserted, or the latest `count` rows if none were new."""
+    conn = get_conn()
+    jokes = _drop_seen(jokes)
+    if not jokes:
+        return conn.execute(SQL_LATEST, (count,)).fetchall()
+
+    now = time.time_ns() // 1_000_000
+    rows_in = [
+        (d.get("id"), d.get("type"), d.get("setup") or "", d.get("punchline") or "", now)
+        for d in jokes
+    ]
+
+    inserted: List[tuple] = []
+    with conn:  # commits on success, rolls back on error
+        # Take the write lock up front and insert the whole batch in one transaction.
+        # INSERT OR IGNORE ensures uniqueness by external_id; RETURNING yields nothing for ignored rows.
+        conn.execute("BEGIN IMMEDIATE")
+        for params in rows_in:
+            row = conn.execute(SQL_INSERT, params).fetchone()
+            if row:
+                inserted.append(row)
+    _mark_seen([r[0] for r in rows_in])
+
+    if inserted:
+        inserted.reverse()  # newest first, like the read endpoints
+        return inserted
+    return conn.execute(SQL_LATEST, (count,)).fetchall()
 
 # --- Schemas -----------------------------------------------------------------
 class JokeOut(BaseModel):
@@ -79,38 +357,143 @@ class JokeOut(BaseModel):
 
 class JokeList(BaseModel):
     items: List[JokeOut]
-    total: int
+    total: Optional[int] = None  # only computed on request (`with_total=true`)
     limit: int
     offset: int
+    next_before_id: Optional[int] = None  # pass as `before_id` to get the next page
+
+def joke_dict(row: tuple) -> Dict[str, Any]:
+    d = dict(zip(JOKE_FIELDS, row))
+    ms = d["created_at"]  # stored as epoch ms; the API keeps serving ISO-8601 strings
+    d["created_at"] = datetime.fromtimestamp(ms // 1000, timezone.utc).replace(microsecond=ms % 1000 * 1000).isoformat()
+    return d
+
+# DB rows already match these schemas, so the endpoints below return JSONResponse directly:
+# FastAPI then skips re-validating each row against `response_model`, which stays for the docs.
+def joke_list_response(rows: List[tuple], limit: int, offset: int = 0,
+                       total: Optional[int] = None, next_before_id: Optional[int] = None) -> JSONResponse:
+    return JSONResponse({
+        "items": [joke_dict(r) for r in rows],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_before_id": next_before_id,
+    })
 
 # --- External client ----------------------------------------------------------
-async def fetch_random_joke() -> Dict[str, Any]:
-    url = f"{EXTERNAL_JOKE_BASE_URL}/random_joke"
-    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT_S) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.json()
+def new_http_client() -> httpx.AsyncClient:
+    # One pooled client for the app's lifetime, so calls reuse keep-alive TCP/TLS connections.
+    return httpx.AsyncClient(
+        base_url=EXTERNAL_JOKE_BASE_URL,
+        timeout=REQUEST_TIMEOUT_S,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    )
 
-# --- FastAPI app --------------------------------------------------------------
-app = FastAPI(title="Minimal Joke API")
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open."""
+
+class CircuitBreaker:
+    """Fail fast after `fail_max` consecutive failures.
+
+    After `reset_timeout` s the breaker is half-open: a single trial call goes through while
+    every other call keeps failing fast. The trial's outcome closes or re-opens the breaker.
+    """
 
-@app.on_event("startup")
-def _startup():
+    def __init__(self, fail_max: int, reset_timeout: float):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._epoch = 0  # bumped on every open; outcomes of calls from an older epoch are ignored
+
+    @property
+    def is_open(self) -> bool:
+        if self._opened_at is None:
+            return False
+        return self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._epoch += 1
+
+    async def call(self, fn, *args, **kwargs):
+        if self.is_open:
+            raise CircuitOpenError()
+        trial = self._opened_at is not None  # half-open: this call is the one trial
+        if trial:
+            self._trial_in_flight = True
+        epoch = self._epoch
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            if trial:
+                self._open()
+            elif epoch == self._epoch:
+                self._failures += 1
+                if self._failures >= self.fail_max:
+                    self._open()
+            raise
+        finally:
+            if trial:
+                self._trial_in_flight = False
+        if trial or epoch == self._epoch:  # a success from before the breaker opened proves nothing
+            self._failures = 0
+            self._opened_at = None
+        return result
+
+breaker = CircuitBreaker(fail_max=BREAKER_FAIL_MAX, reset_timeout=BREAKER_RESET_S)
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.ConnectError)
+
+async def _get_random_joke(client: httpx.AsyncClient) -> Dict[str, Any]:
+    r = await client.get("/random_joke")
+    r.raise_for_status()
+    return r.json()
+
+async def fetch_random_joke(client: httpx.AsyncClient) -> Dict[str, Any]:
+    # Retry transient failures with full-jitter exponential backoff (capped at 1s).
+    # Timeouts are not retried so a slow upstream costs at most one REQUEST_TIMEOUT_S.
+    for attempt in range(FETCH_ATTEMPTS - 1):
+        try:
+            return await breaker.call(_get_random_joke, client)
+        except httpx.HTTPError as exc:
+            if not _is_transient(exc):
+                raise
+        await asyncio.sleep(random.uniform(0, min(1.0, 0.1 * 2**attempt)))
+    return await breaker.call(_get_random_joke, client)
+
+# --- FastAPI app --------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived resources are opened once here rather than per request.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_db()
+    app.state.http = new_http_client()
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        close_conns()
+
+app = FastAPI(title="Minimal Joke API", lifespan=lifespan)
 
 # ---- Auth endpoints ----------------------------------------------------------
 @app.post("/auth/token")
 def issue_token(form: OAuth2PasswordRequestForm = Depends()):
-    # super-minimal auth: accept the demo user only
-    if DEMO_USERS.get(form.username) != form.password:
+    # super-minimal auth: accept the demo user only (constant-time password check)
+    expected = DEMO_USERS.get(form.username)
+    if expected is None or not secrets.compare_digest(form.password.encode(), expected.encode()):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    token = secrets.token_urlsafe(32)
-    TOKENS[token] = form.username
-    return {"access_token": token, "token_type": "bearer"}
+    return {"access_token": issue_jwt(form.username), "token_type": "bearer"}
 
 # ---- Business endpoints ------------------------------------------------------
 @app.post("/jokes/fetch", response_model=JokeList, summary="Fetch N jokes from the public API and persist uniques")
 async def fetch_and_store(
+    request: Request,
     count: int = Query(1, ge=1, le=20, description="How many jokes to fetch"),
     user: str = Depends(get_current_user),
 ):
@@ -118,83 +501,60 @@ async def fetch_and_store(
     Calls the external joke API `count` times, stores unique jokes (by external_id),
     and returns the most recently stored jokes (not guaranteed to equal `count` if duplicates occur).
     """
-    stored_ids: list[int] = []
-    now = datetime.now(timezone.utc).isoformat()
-
-    with connect() as conn:
-        for _ in range(count):
-            data = await fetch_random_joke()
-            ext_id = data.get("id")
-            setup = data.get("setup") or ""
-            punchline = data.get("punchline") or ""
-            jtype = data.get("type")
-
-            # INSERT OR IGNORE ensures uniqueness by external_id
-            cur = conn.execute(
-                """
-                INSERT OR IGNORE INTO jokes (external_id, type, setup, punchline, created_at)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (ext_id, jtype, setup, punchline, now),
-            )
-            if cur.rowcount:  # inserted
-                stored_ids.append(cur.lastrowid)
-        conn.commit()
-
-        # Return the latest items we just inserted (if any) else latest overall
-        if stored_ids:
-            placeholders = ",".join(["?"] * len(stored_ids))
-            rows = conn.execute(
-                f"SELECT id, external_id, type, setup, punchline, created_at FROM jokes WHERE id IN ({placeholders}) ORDER BY id DESC",
-                stored_ids,
-            ).fetchall()
-        else:
-            rows = conn.execute(
-                "SELECT id, external_id, type, setup, punchline, created_at FROM jokes ORDER BY id DESC LIMIT ?",
-                (count,),
-            ).fetchall()
-
-    items = [JokeOut(**dict(r)) for r in rows]
-    return JokeList(items=items, total=len(items), limit=len(items), offset=0)
+    if breaker.is_open:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Joke API unavailable, try again later")
+
+    # Fire all upstream calls at once; total latency is roughly one round-trip.
+    results = await asyncio.gather(
+        *(fetch_random_joke(request.app.state.http) for _ in range(count)),
+        return_exceptions=True,
+    )
+    fetched = [d for d in results if isinstance(d, dict)]
+    if not fetched:
+        if breaker.is_open:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Joke API unavailable, try again later")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Joke API unavailable")
+
+    # SQLite calls block (lock waits, fsync on commit); keep them off the event loop.
+    rows = await asyncio.to_thread(persist_jokes, fetched, count)
+
+    return joke_list_response(rows, limit=len(rows), total=len(rows))
 
 @app.get("/jokes", response_model=JokeList, summary="List stored jokes")
 def list_jokes(
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Prefer `before_id`; large offsets scan and discard rows"),
+    before_id: Optional[int] = Query(None, ge=1, le=MAX_ROWID, description="Keyset cursor: only return jokes with id < before_id"),
     q: Optional[str] = Query(None, description="Search in setup/punchline"),
+    with_total: bool = Query(False, description="Also count all matching jokes"),
     user: str = Depends(get_current_user),
 ):
-    where = ""
-    params: list[Any] = []
-    if q:
-        where = "WHERE setup LIKE ? OR punchline LIKE ?"
+    # Seek on the primary key instead of paging by OFFSET alone.
+    cursor = before_id if before_id is not None else MAX_ROWID
+    total: Optional[int] = None
+
+    conn = get_conn()
+    if q and len(q) >= FTS_MIN_QUERY_LEN:
+        match = fts_phrase(q)
+        if with_total:
+            total = conn.execute(SQL_COUNT_SEARCH, (match,)).fetchone()[0]
+        rows = conn.execute(SQL_LIST_SEARCH, (match, cursor, limit, offset)).fetchall()
+    elif q:  # too short for trigrams; fall back to a scan
         like = f"%{q}%"
-        params.extend([like, like])
-
-    with connect() as conn:
-        total = conn.execute(f"SELECT COUNT(*) FROM jokes {where}", params).fetchone()[0]
-        params_with_paging = params + [limit, offset]
-        rows = conn.execute(
-            f"""
-            SELECT id, external_id, type, setup, punchline, created_at
-            FROM jokes
-            {where}
-            ORDER BY id DESC
-            LIMIT ? OFFSET ?
-            """,
-            params_with_paging,
-        ).fetchall()
-
-    items = [JokeOut(**dict(r)) for r in rows]
-    return JokeList(items=items, total=total, limit=limit, offset=offset)
+        if with_total:
+            total = conn.execute(SQL_COUNT_LIKE, (like, like)).fetchone()[0]
+        rows = conn.execute(SQL_LIST_LIKE, (cursor, like, like, limit, offset)).fetchall()
+    else:
+        if with_total:
+            total = conn.execute(SQL_COUNT).fetchone()[0]
+        rows = conn.execute(SQL_LIST, (cursor, limit, offset)).fetchall()
+
+    next_before_id = rows[-1][0] if len(rows) == limit else None
+    return joke_list_response(rows, limit, offset, total, next_before_id)
 
 @app.get("/jokes/{joke_id}", response_model=JokeOut, summary="Get a single stored joke by id")
 def get_joke(joke_id: int, user: str = Depends(get_current_user)):
-    with connect() as conn:
-        row = conn.execute(
-            "SELECT id, external_id, type, setup, punchline, created_at FROM jokes WHERE id = ?",
-            (joke_id,),
-        ).fetchone()
+    row = get_conn().execute(SQL_GET_ONE, (joke_id,)).fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    return JokeOut(**dict(row))
+    return JSONResponse(joke_dict(row))